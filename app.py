@@ -1,11 +1,24 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+import altair as alt
 import math
+import os
+import pickle
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache, wraps
+from dataclasses import dataclass
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 # ─────────────────────────────────────────────
 # CONFIG
@@ -14,6 +27,7 @@ NIFTY_TOP10 = [
     "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS",
     "HINDUNILVR.NS", "ITC.NS", "SBIN.NS", "BHARTIARTL.NS", "KOTAKBANK.NS"
 ]
+NIFTY_TOP10_NAMES = tuple(t.replace(".NS", "") for t in NIFTY_TOP10)
 
 SECTOR_INDICES = {
     "IT":      "^CNXIT",
@@ -28,7 +42,17 @@ SECTOR_INDICES = {
     "Media":   "^CNXMEDIA",
 }
 
-IST = pytz.timezone("Asia/Kolkata")
+IST = ZoneInfo("Asia/Kolkata")
+
+SNAPSHOT_DIR = Path(".cache")
+NSE_BACKOFF_S = 120            # after a failed NSE fetch, skip NSE calls for this long
+
+# Session boundaries (IST), as minutes since midnight
+OPEN_M  = 9 * 60 + 15
+SAFE_M  = 9 * 60 + 30
+CLOSE_M = 15 * 60 + 20
+HARD_M  = 15 * 60 + 30
+SETTLE_S = 15 * 60          # after close, wait this long before treating quotes as final
 
 
 # ─────────────────────────────────────────────
@@ -41,12 +65,11 @@ def get_market_status():
     now = ist_now()
     if now.weekday() >= 5:
         return "weekend"
-    t = now.time()
-    def T(s): return datetime.strptime(s, "%H:%M").time()
-    if t < T("09:15"):  return "pre"
-    if t < T("09:30"):  return "opening"
-    if t < T("15:20"):  return "live"
-    if t < T("15:30"):  return "closing"
+    m = now.hour * 60 + now.minute
+    if m < OPEN_M:   return "pre"
+    if m < SAFE_M:   return "opening"
+    if m < CLOSE_M:  return "live"
+    if m < HARD_M:   return "closing"
     return "closed"
 
 def next_market_open():
@@ -65,14 +88,90 @@ def last_trading_day_label():
         d -= timedelta(days=1)
     return d.strftime("%A, %d %b %Y")
 
+def last_close_time():
+    """Most recent 15:30 IST session close at or before now."""
+    d = ist_now()
+    if d.weekday() >= 5 or d.hour * 60 + d.minute < HARD_M:
+        d -= timedelta(days=1)
+        while d.weekday() >= 5:
+            d -= timedelta(days=1)
+    return d.replace(hour=HARD_M // 60, minute=HARD_M % 60, second=0, microsecond=0)
+
+def settled_since(ts):
+    """True when the market is shut and `ts` (epoch s) is after the close has settled."""
+    if get_market_status() not in ("pre", "closed", "weekend"):
+        return False
+    return ts >= last_close_time().timestamp() + SETTLE_S
+
 # ─────────────────────────────────────────────
 # DATA FETCHERS  — period="5d" ensures data
-# is always available regardless of market hours
+# is always available regardless of market hours.
+# Market snapshots are cached with cache_resource so
+# every session shares one object — read-only, do not mutate.
+# In-memory TTLs sit well below the snapshot's `soft`
+# age, so the disk layer decides freshness.
 # ─────────────────────────────────────────────
-@st.cache_data(ttl=300, show_spinner=False)
+def disk_snapshot(soft, hard, ok=bool):
+    """
+    Stale-while-revalidate on-disk layer under the in-memory cache.
+    A snapshot younger than `soft` seconds is served as-is; one younger than `hard`
+    is served immediately while a background thread refetches it. While the market
+    is shut, a snapshot taken after the close is served until the next session.
+    Only results passing `ok` are written, so a failed fetch never overwrites good data.
+    """
+    def decorator(fn):
+        path = SNAPSHOT_DIR / f"{fn.__name__}.pkl"
+        lock = threading.Lock()
+
+        def refresh():
+            value = fn()
+            if ok(value):
+                try:
+                    SNAPSHOT_DIR.mkdir(exist_ok=True)
+                    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                    tmp.write_bytes(pickle.dumps(value))
+                    os.replace(tmp, path)
+                except OSError:
+                    pass
+            return value
+
+        def refresh_in_background():
+            if lock.acquire(blocking=False):
+                def run():
+                    try:
+                        refresh()
+                    finally:
+                        lock.release()
+                threading.Thread(target=run, daemon=True).start()
+
+        @wraps(fn)
+        def wrapper():
+            try:
+                mtime = path.stat().st_mtime
+                age     = time.time() - mtime
+                settled = settled_since(mtime)
+                if age < hard or settled:
+                    value = pickle.loads(path.read_bytes())
+                    if age >= soft and not settled:
+                        refresh_in_background()
+                    return value
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            return refresh()
+        return wrapper
+    return decorator
+
+@st.cache_resource(show_spinner=False)
+def get_ticker(symbol):
+    """Shared yf.Ticker per symbol (session + crumb reused). Treat as read-only."""
+    import yfinance as yf   # deferred: keeps the ~200 ms import off the first paint
+    return yf.Ticker(symbol)
+
+@st.cache_resource(ttl=60, max_entries=2, show_spinner=False)
+@disk_snapshot(soft=300, hard=600, ok=lambda v: v[0] is not None)
 def fetch_vix():
     try:
-        data = yf.Ticker("^INDIAVIX").history(period="5d", interval="1d")
+        data = get_ticker("^INDIAVIX").history(period="5d", interval="1d")
         if data.empty:
             return None, None
         latest = round(float(data["Close"].iloc[-1]), 2)
@@ -81,154 +180,253 @@ def fetch_vix():
     except Exception:
         return None, None
 
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_nifty_top10():
+@st.cache_resource(ttl=60, max_entries=2, show_spinner=False)
+@disk_snapshot(soft=300, hard=600)
+def fetch_nifty_spot():
+    """Last NIFTY 50 price — a light chart call, so spot is known without the option chain."""
     try:
-        data = yf.download(NIFTY_TOP10, period="5d", interval="1d",
-                           progress=False, auto_adjust=True)["Close"]
-        results = {}
-        for ticker in NIFTY_TOP10:
-            name = ticker.replace(".NS", "")
-            try:
-                prev  = float(data[ticker].iloc[-2])
-                today = float(data[ticker].iloc[-1])
-                results[name] = round(((today - prev) / prev) * 100, 2)
-            except Exception:
-                results[name] = None
-        return results
+        data = get_ticker("^NSEI").history(period="5d", interval="1d")
+        return round(float(data["Close"].iloc[-1]), 2) if not data.empty else None
     except Exception:
-        return {}
+        return None
 
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_sectors():
+def pct_changes(data, names):
+    """Last-day % change per symbol in `data`, keyed by display name."""
+    closes = data.reindex(columns=list(names)).tail(2)
+    pct    = (closes.iloc[-1] / closes.iloc[-2] - 1.0) * 100.0
+    return {names[sym]: (None if pd.isna(v) else round(float(v), 2)) for sym, v in pct.items()}
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Keep-alive session shared by the direct Yahoo calls. Treat as read-only."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"})
+    return session
+
+def fetch_spark_closes(symbols):
+    """Daily closes from Yahoo's spark endpoint — one DataFrame column per symbol, indexed by date."""
+    resp = get_http_session().get(
+        "https://query1.finance.yahoo.com/v7/finance/spark",
+        params={"symbols": ",".join(symbols), "range": "5d", "interval": "1d"},
+        timeout=10,
+    )
+    resp.raise_for_status()
+    closes = {}
+    for item in resp.json()["spark"]["result"]:
+        r     = item["response"][0]
+        dates = pd.to_datetime(r["timestamp"], unit="s").normalize()
+        closes[item["symbol"]] = pd.Series(r["indicators"]["quote"][0]["close"],
+                                           index=dates, dtype="float64")
+    return pd.DataFrame(closes)
+
+@st.cache_resource(ttl=60, max_entries=2, show_spinner=False)
+@disk_snapshot(soft=300, hard=600, ok=lambda v: any(x is not None for d in v for x in d.values()))
+def fetch_breadth_bundle():
+    """Top 10 stocks + sector indices in one request — returns (top10, sectors)."""
+    tickers = NIFTY_TOP10 + list(SECTOR_INDICES.values())
     try:
-        tickers = list(SECTOR_INDICES.values())
-        data = yf.download(tickers, period="5d", interval="1d",
-                           progress=False, auto_adjust=True)["Close"]
-        results = {}
-        for sector, sym in SECTOR_INDICES.items():
-            try:
-                prev  = float(data[sym].iloc[-2])
-                today = float(data[sym].iloc[-1])
-                results[sector] = round(((today - prev) / prev) * 100, 2)
-            except Exception:
-                results[sector] = None
-        return results
+        data = fetch_spark_closes(tickers)
     except Exception:
-        return {}
-
-@st.cache_data(ttl=300, show_spinner=False)
+        try:  # spark endpoint unavailable — fall back to yfinance
+            import yfinance as yf
+            data = yf.download(tickers, period="5d", interval="1d",
+                               progress=False, auto_adjust=True)["Close"]
+        except Exception:
+            return {}, {}
+    if len(data) < 2:
+        return {}, {}
+    top10   = pct_changes(data, dict(zip(NIFTY_TOP10, NIFTY_TOP10_NAMES)))
+    sectors = pct_changes(data, {sym: sector for sector, sym in SECTOR_INDICES.items()})
+    return top10, sectors
+
+def nearest_chain_yfinance(symbol):
+    """Nearest-expiry OI via yfinance, which handles Yahoo's cookie/crumb — (put_oi, call_oi, expiry, spot)."""
+    # Fresh Ticker on purpose: yfinance accumulates expiries per instance, so a
+    # shared one would keep serving past expiries. Its HTTP session is shared anyway.
+    import yfinance as yf
+    ticker = yf.Ticker(symbol)
+    chain  = ticker.option_chain()            # nearest expiry + underlying quote, one request
+    if chain.calls is None:
+        raise ValueError(f"no option chain for {symbol}")
+    put_oi  = np.nansum(chain.puts["openInterest"].to_numpy(dtype="float64"))
+    call_oi = np.nansum(chain.calls["openInterest"].to_numpy(dtype="float64"))
+    expiry  = ticker.options[0]               # populated by the call above — no extra request
+    return put_oi, call_oi, expiry, (chain.underlying or {}).get("regularMarketPrice")
+
+# Slowest fetcher: short in-memory TTL so the soft/hard snapshot ages decide freshness
+@st.cache_resource(ttl=60, max_entries=2, show_spinner=False)
+@disk_snapshot(soft=180, hard=900)
 def fetch_oi_ratio():
     try:
-        nifty = yf.Ticker("^NSEI")
-        expirations = nifty.options
-        if not expirations:
-            return None
-        chain   = nifty.option_chain(expirations[0])
-        put_oi  = int(chain.puts["openInterest"].sum())
-        call_oi = int(chain.calls["openInterest"].sum())
+        put_oi, call_oi, expiry, price = nearest_chain_yfinance("^NSEI")
+        put_oi, call_oi = int(put_oi), int(call_oi)
         if call_oi == 0:
             return None
-        spot = nifty.history(period="5d", interval="1d")
-        current_price = round(float(spot["Close"].iloc[-1]), 2) if not spot.empty else "N/A"
-        return round(put_oi / call_oi, 3), put_oi, call_oi, expirations[0], current_price
+        current_price = round(float(price), 2) if price else "N/A"
+        return round(put_oi / call_oi, 3), put_oi, call_oi, expiry, current_price
     except Exception:
         return None
 
-@st.cache_data(ttl=60, show_spinner=False)
-def fetch_live_nse_pcr():
-    """Fetch live PCR directly from NSE option chain (your original approach — more accurate)."""
-    url = "https://www.nseindia.com/api/option-chain-indices?symbol=NIFTY"
-    headers = {
+@st.cache_resource(show_spinner=False)
+def get_nse_session():
+    """Pooled, retrying NSE session. The homepage GET sets the cookies the API needs."""
+    session = requests.Session()
+    # Only retry the listed statuses — a blackholed connection should fail after one timeout
+    retry = Retry(total=3, connect=0, read=0, backoff_factor=0.3,
+                  status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"])
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry))
+    session.headers.update({
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
         "Accept-Language": "en-US,en;q=0.9",
         "Accept": "application/json",
         "Referer": "https://www.nseindia.com/",
-    }
+    })
+    session.get("https://www.nseindia.com", timeout=10)
+    return session
+
+@st.cache_resource(show_spinner=False)
+def nse_backoff():
+    """Shared {"until": epoch s} — NSE is not called again before then after a failure."""
+    return {"until": 0.0}
+
+# Refreshed off the request path: past `soft` the last chain is served while a
+# background thread refetches it, so only a cold start waits on NSE.
+@st.cache_resource(ttl=15, max_entries=2, show_spinner=False)
+@disk_snapshot(soft=45, hard=300)
+def fetch_live_nse_pcr():
+    """
+    Fetch live PCR directly from NSE option chain (your original approach — more accurate).
+    Returns the same (ratio, put_oi, call_oi, expiry, spot) shape as fetch_oi_ratio;
+    OI is summed over all expiries, so `expiry` says so rather than naming one.
+    """
+    url = "https://www.nseindia.com/api/option-chain-indices?symbol=NIFTY"
+    backoff = nse_backoff()
+    if time.time() < backoff["until"]:
+        return None
     try:
-        session = requests.Session()
-        session.get("https://www.nseindia.com", headers=headers, timeout=10)
-        resp = session.get(url, headers=headers, timeout=10)
-        data = resp.json()
-        put_oi, call_oi = 0, 0
-        for item in data["records"]["data"]:
-            if "PE" in item: put_oi  += item["PE"]["openInterest"]
-            if "CE" in item: call_oi += item["CE"]["openInterest"]
+        session = get_nse_session()
+        resp = session.get(url, timeout=10)
+        try:
+            data = orjson.loads(resp.content) if resp.ok else {}
+        except orjson.JSONDecodeError:   # HTML / bot-check page instead of JSON
+            data = {}
+        if "records" not in data:   # cookies expired (401/403, a bare {} or a non-JSON body) — warm up again
+            session.get("https://www.nseindia.com", timeout=10)
+            resp = session.get(url, timeout=10)
+            data = orjson.loads(resp.content)
+        records = data["records"]
+        rows    = records["data"]
+        put_oi  = sum(r["PE"]["openInterest"] for r in rows if "PE" in r)
+        call_oi = sum(r["CE"]["openInterest"] for r in rows if "CE" in r)
         if call_oi == 0:
             return None
-        return round(put_oi / call_oi, 3)
+        expiry  = "All expiries"   # the PCR sums every expiry, unlike Yahoo's nearest-expiry chain
+        spot    = records.get("underlyingValue") or "N/A"
+        return round(put_oi / call_oi, 3), int(put_oi), int(call_oi), expiry, spot
     except Exception:
+        backoff["until"] = time.time() + NSE_BACKOFF_S
         return None
 
 
+def count_up_down(changes):
+    """(up, down) counts over a {name: % change} dict — None entries are skipped."""
+    vals = np.fromiter((v for v in changes.values() if v is not None), dtype=np.float32)
+    return int((vals > 0).sum()), int((vals < 0).sum())
+
+# VIX policy: a reading strictly above a threshold moves up one band.
+VIX_BLOCK      = -999
+VIX_THRESHOLDS = (15, 20)
+VIX_BANDS      = ((0,         "🟢 Safe zone"),
+                  (-10,       "🟡 Elevated — Reduce size"),
+                  (VIX_BLOCK, "🔴 DANGER — Avoid selling"))
+
+@lru_cache(maxsize=128)
 def score_vix(vix):
-    if vix is None:  return 0,    "Unknown"
-    if vix > 20:     return -999, f"{vix} 🔴 DANGER — Avoid selling"
-    if vix > 15:     return -10,  f"{vix} 🟡 Elevated — Reduce size"
-    return 0, f"{vix} 🟢 Safe zone"
-
-def score_nifty_breadth(stock_changes):
-    up   = sum(1 for v in stock_changes.values() if v is not None and v > 0)
-    down = sum(1 for v in stock_changes.values() if v is not None and v < 0)
+    if vix is None:  return 0, "Unknown"
+    adj, text = VIX_BANDS[bisect_left(VIX_THRESHOLDS, vix)]
+    return adj, f"{vix} {text}"
+
+# Scorers return a direction tag alongside the display label:
+# +1 Bullish, -1 Bearish, 0 Neutral — trading logic reads the tag, never the label.
+BULL, NEUTRAL, BEAR = 1, 0, -1
+
+@lru_cache(maxsize=128)
+def score_nifty_breadth(up, down):
     if not (up + down):
-        return 15, "15 Neutral", up, down
+        return 15, "15 Neutral", NEUTRAL, up, down
     if up >= 6:
         pts = round((up / 10) * 30, 1)
-        return pts, f"{pts} Bullish ({up}/10 up)", up, down
+        return pts, f"{pts} Bullish ({up}/10 up)", BULL, up, down
     if down >= 6:
         pts = round((down / 10) * 30, 1)
-        return pts, f"{pts} Bearish ({down}/10 down)", up, down
-    return 15, f"15 Neutral ({up} up / {down} down)", up, down
+        return pts, f"{pts} Bearish ({down}/10 down)", BEAR, up, down
+    return 15, f"15 Neutral ({up} up / {down} down)", NEUTRAL, up, down
 
+@lru_cache(maxsize=128)
 def score_oi_ratio(ratio):
     if ratio is None:
-        return 15, "15 Neutral (data unavailable)"
+        return 15, "15 Neutral (data unavailable)", NEUTRAL
     if ratio > 1:
         pts = round(min(30, (ratio - 1) * 30 + 15), 1)
-        return pts, f"{pts} Bullish (OI ratio {ratio})"
+        return pts, f"{pts} Bullish (OI ratio {ratio})", BULL
     if ratio < 0.7:
         pts = round(min(30, (1 - ratio) * 30 + 15), 1)
-        return pts, f"{pts} Bearish (OI ratio {ratio})"
-    return 15, f"15 Neutral (OI ratio {ratio})"
+        return pts, f"{pts} Bearish (OI ratio {ratio})", BEAR
+    return 15, f"15 Neutral (OI ratio {ratio})", NEUTRAL
 
+@lru_cache(maxsize=128)
 def score_adv_dec(advances, declines):
-    if advances == 0 and declines == 0: return 10, "10 Neutral"
-    if declines == 0:  return 20, "20 Bullish (all advances)"
-    if advances == 0:  return 20, "20 Bearish (all declines)"
-    ratio    = advances / declines
-    strength = min(1, abs(math.log(ratio)))
+    if advances == 0 and declines == 0: return 10, "10 Neutral", NEUTRAL
+    if declines == 0:  return 20, "20 Bullish (all advances)", BULL
+    if advances == 0:  return 20, "20 Bearish (all declines)", BEAR
+    skew     = (advances - declines) / declines     # ratio - 1
+    strength = min(1, abs(math.log1p(skew)))
     pts      = round(strength * 20, 1)
-    if ratio > 1.1:   return pts, f"{pts} Bullish ({advances}A / {declines}D)"
-    if ratio < 0.9:   return pts, f"{pts} Bearish ({advances}A / {declines}D)"
-    return 10, f"10 Neutral ({advances}A / {declines}D)"
+    if skew > 0.1:    return pts, f"{pts} Bullish ({advances}A / {declines}D)", BULL
+    if skew < -0.1:   return pts, f"{pts} Bearish ({advances}A / {declines}D)", BEAR
+    return 10, f"10 Neutral ({advances}A / {declines}D)", NEUTRAL
 
-def score_sectors(sector_changes):
-    bull = sum(1 for v in sector_changes.values() if v is not None and v > 0)
-    bear = sum(1 for v in sector_changes.values() if v is not None and v < 0)
+@lru_cache(maxsize=128)
+def score_sectors(bull, bear):
     if not (bull + bear):
-        return 10, "10 Neutral", bull, bear
+        return 10, "10 Neutral", NEUTRAL, bull, bear
     if bull > 0 and bear > 0:
-        ratio    = bull / bear
-        strength = min(1, abs(math.log(ratio)))
+        skew     = (bull - bear) / bear     # ratio - 1
+        strength = min(1, abs(math.log1p(skew)))
         pts      = round(strength * 20, 1)
-        if ratio > 1.1:  return pts, f"{pts} Bullish ({bull}🟢 / {bear}🔴)", bull, bear
-        if ratio < 0.9:  return pts, f"{pts} Bearish ({bull}🟢 / {bear}🔴)", bull, bear
-        return 10, f"10 Neutral ({bull}🟢 / {bear}🔴)", bull, bear
-    if bull > bear:  return 20, f"20 Bullish ({bull}🟢 / {bear}🔴)", bull, bear
-    return 20, f"20 Bearish ({bull}🟢 / {bear}🔴)", bull, bear
-
-def get_trade_recommendation(score, details, vix_blocked):
+        if skew > 0.1:   return pts, f"{pts} Bullish ({bull}🟢 / {bear}🔴)", BULL, bull, bear
+        if skew < -0.1:  return pts, f"{pts} Bearish ({bull}🟢 / {bear}🔴)", BEAR, bull, bear
+        return 10, f"10 Neutral ({bull}🟢 / {bear}🔴)", NEUTRAL, bull, bear
+    if bull > bear:  return 20, f"20 Bullish ({bull}🟢 / {bear}🔴)", BULL, bull, bear
+    return 20, f"20 Bearish ({bull}🟢 / {bear}🔴)", BEAR, bull, bear
+
+@dataclass(slots=True, frozen=True)
+class Signals:
+    """Per-indicator labels plus their direction tags in (nifty, oi, adv_dec, sector) order."""
+    nifty:      str
+    oi:         str
+    adv_dec:    str
+    sector:     str
+    directions: tuple
+
+    @property
+    def labels(self):
+        return self.nifty, self.oi, self.adv_dec, self.sector
+
+PARAM_NAMES = ("Nifty Top 10", "PCR / OI Ratio", "Advance-Decline", "Sector Heatmap")
+
+@lru_cache(maxsize=128)
+def get_trade_recommendation(score, sig, vix_blocked):
     if vix_blocked:
         return {"type": "BLOCKED",
                 "message": "🚫 VIX too high — Do NOT sell options today",
                 "delta": "Stay flat"}
-    bullish = sum("Bullish" in v for v in details.values())
-    bearish = sum("Bearish" in v for v in details.values())
-    if abs(bullish - bearish) <= 1 or score < 65:
+    net = sum(sig.directions)
+    if abs(net) <= 1 or score < 65:
         return {"type": "FLAT",
                 "message": "⚖️ Mixed signals → Sell BOTH sides (Iron Condor / Strangle)",
                 "delta": "10–20Δ CE & PE"}
-    direction = "PUT side (Bullish)" if bullish > bearish else "CALL side (Bearish)"
+    direction = "PUT side (Bullish)" if net > 0 else "CALL side (Bearish)"
     if score >= 80:
         return {"type": "DIRECTIONAL",
                 "message": f"🔥 Strong edge → Sell {direction}",
@@ -238,10 +436,30 @@ def get_trade_recommendation(score, details, vix_blocked):
             "delta": "0.30Δ"}
 
 
-def get_param_signals(details, vix_label, vix_blocked):
+@lru_cache(maxsize=256)
+def compute_scores(vix, oi_ratio, breadth, sector_counts, advances, declines):
+    """
+    Full scoring pass over hashable inputs (breadth/sector_counts are (up, down) pairs),
+    so repeat clicks on unchanged data are a single cache hit.
+    Returns (final_score, vix_label, vix_blocked, Signals).
+    """
+    vix_adj, vix_label    = score_vix(vix)
+    vix_blocked           = vix_adj == VIX_BLOCK
+    s_nifty, l_nifty, d_nifty, _, _ = score_nifty_breadth(*breadth)
+    s_oi,    l_oi,    d_oi          = score_oi_ratio(oi_ratio)
+    s_adv,   l_adv,   d_adv         = score_adv_dec(advances, declines)
+    s_sec,   l_sec,   d_sec, _, _   = score_sectors(*sector_counts)
+
+    final_score = max(0, s_nifty + s_oi + s_adv + s_sec + (vix_adj if not vix_blocked else 0))
+    sig = Signals(l_nifty, l_oi, l_adv, l_sec, (d_nifty, d_oi, d_adv, d_sec))
+    return final_score, vix_label, vix_blocked, sig
+
+
+@lru_cache(maxsize=64)
+def get_param_signals(sig, vix_label, vix_blocked):
     """
     For each parameter, return what option action it suggests individually.
-    Returns list of dicts: {param, signal_text, action, emoji}
+    Returns a tuple of row dicts (cached and shared — treat as read-only).
     """
     rows = []
 
@@ -259,20 +477,12 @@ def get_param_signals(details, vix_label, vix_blocked):
                      "Signal": "🟢 Safe", "Option Action": "Normal selling allowed",
                      "Delta Guidance": "Up to 0.30–0.40Δ"})
 
-    param_map = {
-        "Nifty Breadth":   "Nifty Top 10",
-        "OI Ratio (P/C)":  "PCR / OI Ratio",
-        "Advance-Decline": "Advance-Decline",
-        "Sector Heatmap":  "Sector Heatmap",
-    }
-
-    for key, display in param_map.items():
-        text = details.get(key, "Neutral")
-        if "Bullish" in text:
+    for display, text, tag in zip(PARAM_NAMES, sig.labels, sig.directions):
+        if tag == BULL:
             action = "Sell PE (Put) — market likely to go UP"
             delta  = "0.25–0.35Δ PE"
             signal = "🟢 Bullish"
-        elif "Bearish" in text:
+        elif tag == BEAR:
             action = "Sell CE (Call) — market likely to go DOWN"
             delta  = "0.25–0.35Δ CE"
             signal = "🔴 Bearish"
@@ -283,7 +493,7 @@ def get_param_signals(details, vix_label, vix_blocked):
         rows.append({"Parameter": display, "Reading": text,
                      "Signal": signal, "Option Action": action,
                      "Delta Guidance": delta})
-    return rows
+    return tuple(rows)
 
 
 
@@ -448,20 +658,69 @@ def render_strike_calculator(spot, vix, trade, score):
         st.caption("⚠️ These are guideline strikes. Always verify with your broker's option chain and actual Greeks before entering.")
 
 
-def color_signal(label, text):
-    if "Bullish" in text:   st.markdown(f"**{label}:** :green[{text}]")
-    elif "Bearish" in text: st.markdown(f"**{label}:** :red[{text}]")
-    else:                   st.markdown(f"**{label}:** :orange[{text}]")
+def pie_chart(labels, values, title):
+    """Two-slice green/red pie, rendered client-side by Vega-Lite."""
+    df = pd.DataFrame({"Label": labels, "Count": values})
+    return alt.Chart(df, title=title).mark_arc().encode(
+        theta="Count:Q",
+        color=alt.Color("Label:N", sort=labels,
+                        scale=alt.Scale(domain=labels, range=["#00e5a0", "#ff4444"])),
+        tooltip=["Label", "Count"],
+    )
+
+
+HISTORY_MAX    = 50
+HISTORY_DTYPES = {"Time (IST)": "object", "VIX": "float32", "OI Ratio": "float32",
+                  "Score": "float32", "Signal": "object", "Delta": "object", "Strike": "object"}
+
+def clear_history():
+    st.session_state.history.clear()
+    st.session_state.history_rev += 1
+
+def history_frame():
+    """Session trade log as a typed DataFrame — rebuilt only after a new row was logged."""
+    ss = st.session_state
+    if ss.get("history_df_rev") != ss.history_rev:
+        ss.history_df = pd.DataFrame(list(ss.history), columns=list(HISTORY_DTYPES)).astype(HISTORY_DTYPES)
+        ss.history_df_rev = ss.history_rev
+    return ss.history_df
+
+
+# First matching pattern wins, so bullish/bearish cues outrank the DANGER/neutral ones.
+SIGNAL_STYLES = (
+    ("🟢|Bullish|PE",     "background-color: #0d2e1e; color: #00e5a0"),
+    ("🔴|Bearish|CE",     "background-color: #2e0d1a; color: #ff4444"),
+    ("🚫|DANGER",         "background-color: #2e1a0d; color: #ff8800"),
+    ("🟡|Neutral|both",   "background-color: #2a2a0d; color: #ffd700"),
+)
+
+def style_signal_col(col):
+    """Styler.apply column function — one vectorised substring scan per pattern."""
+    text = col.astype(str)
+    return np.select([text.str.contains(pat, regex=True) for pat, _ in SIGNAL_STYLES],
+                     [css for _, css in SIGNAL_STYLES], default="")
+
+def color_signal(label, text, tag):
+    if tag == BULL:    st.markdown(f"**{label}:** :green[{text}]")
+    elif tag == BEAR:  st.markdown(f"**{label}:** :red[{text}]")
+    else:              st.markdown(f"**{label}:** :orange[{text}]")
 
 # ─────────────────────────────────────────────
 # UI COMPONENTS
 # ─────────────────────────────────────────────
-def render_data_cards(vix_tuple, top10, sectors, oi_data, heading):
+@st.cache_data(ttl=300, max_entries=8)
+def change_table(changes, label):
+    """{name: % change} → two-column frame for the detail expanders, built column-wise.
+    Cached per input so reruns on unchanged data skip the formatting pass."""
+    vals = pd.Series(changes, dtype="float64")
+    text = vals.map("{:+.2f}%".format).where(vals.notna(), "N/A")
+    return pd.DataFrame({label: vals.index, "Change": text.to_numpy()})
+
+def render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, heading):
     vix      = vix_tuple[0]
     vix_prev = vix_tuple[1]
     oi_ratio = oi_data[0] if oi_data else None
     expiry   = oi_data[3] if oi_data else "N/A"
-    spot     = oi_data[4] if oi_data else "N/A"
 
     st.subheader(heading)
     c1, c2, c3, c4 = st.columns(4)
@@ -472,36 +731,32 @@ def render_data_cards(vix_tuple, top10, sectors, oi_data, heading):
                   delta=f"prev {vix_prev}" if vix_prev else None,
                   delta_color=color)
     with c2:
-        up   = sum(1 for v in top10.values() if v and v > 0)
-        down = sum(1 for v in top10.values() if v and v < 0)
+        up, down = breadth
         st.metric("📊 Nifty Top 10", f"{up} up / {down} down")
     with c3:
         d_label = "Bullish" if (oi_ratio and oi_ratio > 1) else ("Bearish" if (oi_ratio and oi_ratio < 0.7) else "Neutral")
         d_color = "normal" if (oi_ratio and oi_ratio > 1) else ("inverse" if (oi_ratio and oi_ratio < 0.7) else "off")
         st.metric("📈 OI Ratio (P/C)", oi_ratio or "N/A", delta=d_label, delta_color=d_color)
-        if oi_data: st.caption(f"Expiry: {expiry} | Nifty ≈ {spot}")
+        if oi_data or spot: st.caption(f"Expiry: {expiry} | Nifty ≈ {spot or 'N/A'}")
     with c4:
-        sb = sum(1 for v in sectors.values() if v and v > 0)
-        sr = sum(1 for v in sectors.values() if v and v < 0)
+        sb, sr = sector_counts
         st.metric("🏭 Sectors", f"{sb}🟢 / {sr}🔴")
 
     col_l, col_r = st.columns(2)
     with col_l:
         with st.expander("🔍 Nifty Top 10 Detail"):
             if top10:
-                df = pd.DataFrame([(k, f"{v:+.2f}%" if v else "N/A")
-                                   for k, v in top10.items()], columns=["Stock", "Change"])
-                st.dataframe(df, use_container_width=True, hide_index=True)
+                st.dataframe(change_table(top10, "Stock"), use_container_width=True, hide_index=True)
     with col_r:
         with st.expander("🔍 Sector Detail"):
             if sectors:
-                df = pd.DataFrame([(k, f"{v:+.2f}%" if v else "N/A")
-                                   for k, v in sectors.items()], columns=["Sector", "Change"])
-                st.dataframe(df, use_container_width=True, hide_index=True)
+                st.dataframe(change_table(sectors, "Sector"), use_container_width=True, hide_index=True)
 
 
 
-def render_live_scoring(vix_tuple, top10, sectors, oi_data):
+@st.fragment
+def render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot):
+    """Inputs + scoring panel. Runs as a fragment so its widgets don't rerun the whole page."""
     vix = vix_tuple[0]
 
     # ── ALWAYS-VISIBLE INPUT SECTION ──
@@ -511,7 +766,7 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
     inp_col1, inp_col2, inp_col3 = st.columns(3)
 
     # Spot price — always visible, auto-filled if available
-    fetched_spot = oi_data[4] if oi_data and oi_data[4] not in (None, "N/A", 0) else None
+    fetched_spot = spot
     with inp_col1:
         spot_input = st.number_input(
             "📍 Nifty Spot Price",
@@ -539,16 +794,21 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
     st.divider()
     st.subheader("📈 PCR Source")
     use_live_pcr = st.toggle("🔴 Use Live NSE PCR (direct from NSE option chain)", value=True,
+                              key="use_live_pcr",
                               help="Fetches Put/Call ratio directly from NSE — more accurate than yfinance.")
+    if use_live_pcr != st.session_state.get("oi_fetched_live"):
+        st.rerun()   # OI source switched — refetch at page level from the other chain
     if use_live_pcr:
         with st.spinner("Fetching live PCR from NSE..."):
-            live_pcr = fetch_live_nse_pcr()
+            live = fetch_live_nse_pcr()
+        live_pcr = live[0] if live else None
         if live_pcr is not None:
             st.metric("Live NIFTY PCR", live_pcr,
                       help="Source: NSE option chain. PCR > 1 = bullish, < 0.7 = bearish.")
             oi_ratio = live_pcr
         else:
             st.warning("⚠️ Live PCR unavailable — falling back to yfinance OI data or enter manually below.")
+            oi_data  = oi_data or fetch_oi_ratio()
             oi_ratio = oi_data[0] if oi_data else None
             if oi_ratio:
                 st.caption(f"yfinance OI ratio: {oi_ratio}")
@@ -563,33 +823,26 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
                                         step=0.01, key="manual_pcr_direct")
 
     # ── Advance-Decline ──
+    # Typed counts are held by the form and committed with the Calculate click, not per keystroke.
     st.divider()
     st.subheader("⌨️ Advance-Decline")
     st.caption("No free public API — get from [nseindia.com](https://www.nseindia.com) → Market → Advances/Declines")
-    col_a, col_b = st.columns(2)
-    with col_a:
-        advances = st.number_input("🟢 Advances", min_value=0, value=0, step=1)
-    with col_b:
-        declines = st.number_input("🔴 Declines", min_value=0, value=0, step=1)
-
-    st.divider()
-    if st.button("🚀 Calculate Sentiment & Get Trade Signal", type="primary"):
+    with st.form("score_inputs", border=False):
+        col_a, col_b = st.columns(2)
+        with col_a:
+            advances = st.number_input("🟢 Advances", min_value=0, value=0, step=1)
+        with col_b:
+            declines = st.number_input("🔴 Declines", min_value=0, value=0, step=1)
 
-        vix_adj, vix_label             = score_vix(vix)
-        vix_blocked                    = vix_adj == -999
-        s_nifty, l_nifty, n_up, n_down = score_nifty_breadth(top10)
-        s_oi,    l_oi                  = score_oi_ratio(oi_ratio)
-        s_adv,   l_adv                 = score_adv_dec(advances, declines)
-        s_sec,   l_sec, sec_up, sec_dn = score_sectors(sectors)
+        st.divider()
+        calculate = st.form_submit_button("🚀 Calculate Sentiment & Get Trade Signal", type="primary")
 
-        final_score = max(0, s_nifty + s_oi + s_adv + s_sec + (vix_adj if not vix_blocked else 0))
+    if calculate:
 
-        details = {
-            "Nifty Breadth":   l_nifty,
-            "OI Ratio (P/C)":  l_oi,
-            "Advance-Decline": l_adv,
-            "Sector Heatmap":  l_sec,
-        }
+        sec_up, sec_dn = sector_counts
+        final_score, vix_label, vix_blocked, sig = compute_scores(
+            vix, oi_ratio, breadth, sector_counts, advances, declines)
+        d_nifty, d_oi, d_adv, d_sec = sig.directions
 
         # ── Score ──
         st.divider()
@@ -603,21 +856,12 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
             st.warning(f"## 🟡 Sentiment Score: **{final_score:.1f} / 100**")
 
         # ── Gauge ──
-        fig, ax = plt.subplots(figsize=(5, 1.8), facecolor="#0e1117")
-        for lft, wid, c in [(0, 40, "#ff4444"), (40, 30, "#ffd700"), (70, 30, "#00e5a0")]:
-            ax.barh(0, wid, left=lft, color=c, alpha=0.2, height=0.5)
-        bar_c = "#00e5a0" if final_score >= 70 else ("#ffd700" if final_score >= 40 else "#ff4444")
-        ax.barh(0, min(final_score, 100), color=bar_c, height=0.3)
-        ax.set_xlim(0, 100); ax.set_yticks([]); ax.set_facecolor("#0e1117")
-        ax.tick_params(colors="white"); ax.spines[:].set_visible(False)
-        ax.set_xlabel("Score", color="white")
-        ax.set_title(f"Score: {final_score:.1f} / 100", color="white")
-        st.pyplot(fig); plt.close(fig)
+        st.progress(int(min(final_score, 100)), text=f"Score: {final_score:.1f} / 100")
 
         # ── Overall trade recommendation ──
         st.divider()
         st.subheader("🎯 Trade Recommendation")
-        trade = get_trade_recommendation(final_score, details, vix_blocked)
+        trade = get_trade_recommendation(final_score, sig, vix_blocked)
         if trade["type"] == "BLOCKED":        st.error(trade["message"])
         elif trade["type"] == "DIRECTIONAL":  st.success(trade["message"])
         else:                                 st.warning(trade["message"])
@@ -713,8 +957,10 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
         # ── Signal Breakdown ──
         st.divider()
         st.subheader("📌 Signal Breakdown")
-        for k, v in details.items():
-            color_signal(k, v)
+        color_signal("Nifty Breadth",   sig.nifty,   d_nifty)
+        color_signal("OI Ratio (P/C)",  sig.oi,      d_oi)
+        color_signal("Advance-Decline", sig.adv_dec, d_adv)
+        color_signal("Sector Heatmap",  sig.sector,  d_sec)
         vix_color = "red" if vix_blocked else ("orange" if "Elevated" in vix_label else "green")
         st.markdown(f"**VIX Filter:** :{vix_color}[{vix_label}]")
 
@@ -723,21 +969,10 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
         st.subheader("📋 Per-Parameter Option Signal")
         st.caption("What each individual indicator is suggesting — useful when signals conflict.")
 
-        param_rows = get_param_signals(details, vix_label, vix_blocked)
+        param_rows = get_param_signals(sig, vix_label, vix_blocked)
         df_params  = pd.DataFrame(param_rows)
 
-        def highlight_signal(val):
-            if "🟢" in str(val) or "Bullish" in str(val) or "PE" in str(val):
-                return "background-color: #0d2e1e; color: #00e5a0"
-            elif "🔴" in str(val) or "Bearish" in str(val) or "CE" in str(val):
-                return "background-color: #2e0d1a; color: #ff4444"
-            elif "🚫" in str(val) or "DANGER" in str(val):
-                return "background-color: #2e1a0d; color: #ff8800"
-            elif "🟡" in str(val) or "Neutral" in str(val) or "both" in str(val):
-                return "background-color: #2a2a0d; color: #ffd700"
-            return ""
-
-        styled = df_params.style.applymap(highlight_signal, subset=["Signal", "Option Action"])
+        styled = df_params.style.apply(style_signal_col, subset=["Signal", "Option Action"])
         st.dataframe(styled, use_container_width=True, hide_index=True)
 
         votes = {"Sell PE 🟢": 0, "Sell CE 🔴": 0, "Both sides 🟡": 0, "FLAT 🚫": 0}
@@ -752,37 +987,28 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
 
         # ── Charts ──
         st.divider()
-        f2, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 3.5), facecolor="#0e1117")
-        for ax in (ax1, ax2): ax.set_facecolor("#0e1117")
-        if advances + declines > 0:
-            ax1.pie([advances, declines], labels=["Advances", "Declines"],
-                    autopct="%1.1f%%", colors=["#00e5a0", "#ff4444"],
-                    textprops={"color": "white"})
-        else:
-            ax1.text(0.5, 0.5, "No A-D data entered", ha="center", va="center",
-                     color="gray", fontsize=9)
-        ax1.set_title("Advance-Decline", color="white")
-
-        sec_u = sum(1 for v in sectors.values() if v and v > 0)
-        sec_d = sum(1 for v in sectors.values() if v and v < 0)
-        if sec_u + sec_d > 0:
-            ax2.pie([sec_u, sec_d], labels=["Bull Sectors", "Bear Sectors"],
-                    autopct="%1.1f%%", colors=["#00e5a0", "#ff4444"],
-                    textprops={"color": "white"})
-        else:
-            ax2.text(0.5, 0.5, "No sector data", ha="center", va="center",
-                     color="gray", fontsize=9)
-        ax2.set_title("Sector Heatmap", color="white")
-        f2.patch.set_facecolor("#0e1117")
-        st.pyplot(f2); plt.close(f2)
+        ch1, ch2 = st.columns(2)
+        with ch1:
+            if advances + declines > 0:
+                st.altair_chart(pie_chart(["Advances", "Declines"], [advances, declines],
+                                          "Advance-Decline"), use_container_width=True)
+            else:
+                st.caption("Advance-Decline: No A-D data entered")
+        with ch2:
+            if sec_up + sec_dn > 0:
+                st.altair_chart(pie_chart(["Bull Sectors", "Bear Sectors"], [sec_up, sec_dn],
+                                          "Sector Heatmap"), use_container_width=True)
+            else:
+                st.caption("Sector Heatmap: No sector data")
 
         # ── History ──
         if "history" not in st.session_state:
-            st.session_state.history = []
+            st.session_state.history     = deque(maxlen=HISTORY_MAX)
+            st.session_state.history_rev = 0
         st.session_state.history.append({
             "Time (IST)": ist_now().strftime("%H:%M:%S"),
-            "VIX":        vix or "N/A",
-            "OI Ratio":   oi_ratio or "N/A",
+            "VIX":        vix,
+            "OI Ratio":   oi_ratio or None,
             "Score":      round(final_score, 1),
             "Signal":     trade["message"],
             "Delta":      trade["delta"],
@@ -790,15 +1016,13 @@ def render_live_scoring(vix_tuple, top10, sectors, oi_data):
                            else f"{ce_sell}CE" if trade_type == "BEARISH"
                            else f"{pe_sell}PE + {ce_sell}CE") if not vix_blocked else "FLAT",
         })
+        st.session_state.history_rev += 1
 
     if st.session_state.get("history"):
         st.divider()
         st.subheader("📜 Session Trade Log")
-        st.dataframe(pd.DataFrame(st.session_state.history),
-                     use_container_width=True, hide_index=True)
-        if st.button("🗑️ Clear History"):
-            st.session_state.history = []
-            st.rerun()
+        st.dataframe(history_frame(), use_container_width=True, hide_index=True)
+        st.button("🗑️ Clear History", on_click=clear_history)
 
 
 # ─────────────────────────────────────────────
@@ -812,104 +1036,116 @@ status = get_market_status()
 st.caption(f"🕐 {now.strftime('%d %b %Y  %H:%M:%S IST')}")
 
 # ── Fetch data (period='5d' always returns recent data regardless of market hours) ──
+# The fetchers are independent network calls — run them concurrently.
+# OI comes from one option chain: NSE's when the live source is selected, else Yahoo's.
+use_live_pcr = st.session_state.get("use_live_pcr", True)
+st.session_state.oi_fetched_live = use_live_pcr
+oi_src = "nse" if use_live_pcr else "yf"   # OI override keys are per source, so a toggle re-seeds them
 with st.spinner("📡 Fetching market data..."):
-    vix_tuple = fetch_vix()
-    top10     = fetch_nifty_top10()
-    sectors   = fetch_sectors()
-    oi_data   = fetch_oi_ratio()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        f_vix     = pool.submit(fetch_vix)
+        f_breadth = pool.submit(fetch_breadth_bundle)
+        f_oi      = pool.submit(fetch_live_nse_pcr if use_live_pcr else fetch_oi_ratio)
+    vix_tuple       = f_vix.result()
+    top10, sectors  = f_breadth.result()
+    oi_data         = f_oi.result()
+    # Both chains carry spot; the chart call is only a fallback when the chain had none
+    nifty_spot      = oi_data[4] if oi_data and oi_data[4] != "N/A" else fetch_nifty_spot()
 
 # ─────────────────────────────────────────────
 # MANUAL OVERRIDE PANEL
 # ─────────────────────────────────────────────
 with st.expander("🛠️ Manual Data Override — Edit any fetched value or fill missing data", expanded=False):
-    st.caption("All fields are pre-filled with fetched data. Edit any value you're not satisfied with, or fill in data that failed to fetch.")
-
-    ov_col1, ov_col2 = st.columns(2)
-
-    # ── VIX Override ──
-    with ov_col1:
-        st.markdown("**🌡️ India VIX**")
-        vix_fetched = vix_tuple[0]
-        vix_prev_fetched = vix_tuple[1]
-        vix_override = st.number_input(
-            "VIX Value",
-            min_value=0.0, max_value=100.0, step=0.01,
-            value=float(vix_fetched) if vix_fetched else 0.0,
-            key="ov_vix",
-            help="Fetched automatically. Override if value looks wrong."
-        )
-        vix_prev_override = st.number_input(
-            "VIX Prev Close",
-            min_value=0.0, max_value=100.0, step=0.01,
-            value=float(vix_prev_fetched) if vix_prev_fetched else 0.0,
-            key="ov_vix_prev",
-        )
-        if vix_fetched:
-            st.caption(f"✅ Fetched: {vix_fetched} (prev: {vix_prev_fetched})")
-        else:
-            st.caption("⚠️ Fetch failed — please enter manually")
-
-    # ── OI Ratio Override ──
-    with ov_col2:
-        st.markdown("**📈 OI Ratio (Put/Call)**")
-        oi_fetched_ratio   = oi_data[0] if oi_data else None
-        oi_fetched_put     = oi_data[1] if oi_data else 0
-        oi_fetched_call    = oi_data[2] if oi_data else 0
-        oi_fetched_expiry  = oi_data[3] if oi_data else ""
-        oi_fetched_spot    = oi_data[4] if oi_data else 0.0
-
-        oi_put_override  = st.number_input("Put OI",  min_value=0, step=1000,
-                                            value=int(oi_fetched_put),  key="ov_put_oi")
-        oi_call_override = st.number_input("Call OI", min_value=0, step=1000,
-                                            value=int(oi_fetched_call), key="ov_call_oi")
-        oi_expiry_override = st.text_input("Expiry Date", value=oi_fetched_expiry or "", key="ov_expiry")
-        oi_spot_override   = st.number_input("Nifty Spot", min_value=0.0, step=0.5,
-                                              value=float(oi_fetched_spot) if oi_fetched_spot and oi_fetched_spot != "N/A" else 0.0,
-                                              key="ov_spot")
-        if oi_fetched_ratio:
-            st.caption(f"✅ Fetched ratio: {oi_fetched_ratio}")
-        else:
-            st.caption("⚠️ Fetch failed — please enter Put OI & Call OI manually")
-
-    st.divider()
-    ov_col3, ov_col4 = st.columns(2)
-
-    # ── Top 10 Stocks Override ──
-    with ov_col3:
-        st.markdown("**📊 Nifty Top 10 — % Change**")
-        top10_overrides = {}
-        for ticker in NIFTY_TOP10:
-            name = ticker.replace(".NS", "")
-            fetched_val = top10.get(name)
-            top10_overrides[name] = st.number_input(
-                name,
-                min_value=-20.0, max_value=20.0, step=0.01, format="%.2f",
-                value=float(fetched_val) if fetched_val is not None else 0.0,
-                key=f"ov_top10_{name}",
-                help=f"Fetched: {fetched_val}%" if fetched_val is not None else "Not fetched"
+    # A form, so edits are committed together on Apply instead of rerunning the page per keystroke.
+    with st.form("overrides", border=False):
+        st.caption("All fields are pre-filled with fetched data. Edit any value you're not satisfied with, or fill in data that failed to fetch.")
+
+        ov_col1, ov_col2 = st.columns(2)
+
+        # ── VIX Override ──
+        with ov_col1:
+            st.markdown("**🌡️ India VIX**")
+            vix_fetched = vix_tuple[0]
+            vix_prev_fetched = vix_tuple[1]
+            vix_override = st.number_input(
+                "VIX Value",
+                min_value=0.0, max_value=100.0, step=0.01,
+                value=float(vix_fetched) if vix_fetched else 0.0,
+                key="ov_vix",
+                help="Fetched automatically. Override if value looks wrong."
             )
-        if top10:
-            st.caption(f"✅ Fetched {len([v for v in top10.values() if v is not None])}/10 stocks")
-        else:
-            st.caption("⚠️ Fetch failed — enter % changes manually")
-
-    # ── Sectors Override ──
-    with ov_col4:
-        st.markdown("**🏭 Sector % Change**")
-        sector_overrides = {}
-        for sector in SECTOR_INDICES:
-            fetched_val = sectors.get(sector)
-            sector_overrides[sector] = st.number_input(
-                sector,
-                min_value=-20.0, max_value=20.0, step=0.01, format="%.2f",
-                value=float(fetched_val) if fetched_val is not None else 0.0,
-                key=f"ov_sec_{sector}",
-                help=f"Fetched: {fetched_val}%" if fetched_val is not None else "Not fetched"
+            vix_prev_override = st.number_input(
+                "VIX Prev Close",
+                min_value=0.0, max_value=100.0, step=0.01,
+                value=float(vix_prev_fetched) if vix_prev_fetched else 0.0,
+                key="ov_vix_prev",
             )
-        if sectors:
-            st.caption(f"✅ Fetched {len([v for v in sectors.values() if v is not None])}/10 sectors")
-        else:
-            st.caption("⚠️ Fetch failed — enter % changes manually")
+            if vix_fetched:
+                st.caption(f"✅ Fetched: {vix_fetched} (prev: {vix_prev_fetched})")
+            else:
+                st.caption("⚠️ Fetch failed — please enter manually")
+
+        # ── OI Ratio Override ──
+        with ov_col2:
+            st.markdown("**📈 OI Ratio (Put/Call)**")
+            oi_fetched_ratio   = oi_data[0] if oi_data else None
+            oi_fetched_put     = oi_data[1] if oi_data else 0
+            oi_fetched_call    = oi_data[2] if oi_data else 0
+            oi_fetched_expiry  = oi_data[3] if oi_data else ""
+            oi_fetched_spot    = nifty_spot or 0.0
+
+            oi_put_override  = st.number_input("Put OI",  min_value=0, step=1000,
+                                                value=int(oi_fetched_put),  key=f"ov_put_oi_{oi_src}")
+            oi_call_override = st.number_input("Call OI", min_value=0, step=1000,
+                                                value=int(oi_fetched_call), key=f"ov_call_oi_{oi_src}")
+            oi_expiry_override = st.text_input("Expiry Date", value=oi_fetched_expiry or "", key=f"ov_expiry_{oi_src}")
+            oi_spot_override   = st.number_input("Nifty Spot", min_value=0.0, step=0.5,
+                                                  value=float(oi_fetched_spot), key=f"ov_spot_{oi_src}")
+            if oi_fetched_ratio:
+                st.caption(f"✅ Fetched ratio: {oi_fetched_ratio}")
+            else:
+                st.caption("⚠️ Fetch failed — please enter Put OI & Call OI manually")
+
+        st.divider()
+        ov_col3, ov_col4 = st.columns(2)
+
+        # ── Top 10 Stocks Override ──
+        with ov_col3:
+            st.markdown("**📊 Nifty Top 10 — % Change**")
+            top10_overrides = {}
+            for name in NIFTY_TOP10_NAMES:
+                fetched_val = top10.get(name)
+                top10_overrides[name] = st.number_input(
+                    name,
+                    min_value=-20.0, max_value=20.0, step=0.01, format="%.2f",
+                    value=float(fetched_val) if fetched_val is not None else 0.0,
+                    key=f"ov_top10_{name}",
+                    help=f"Fetched: {fetched_val}%" if fetched_val is not None else "Not fetched"
+                )
+            if top10:
+                st.caption(f"✅ Fetched {len([v for v in top10.values() if v is not None])}/10 stocks")
+            else:
+                st.caption("⚠️ Fetch failed — enter % changes manually")
+
+        # ── Sectors Override ──
+        with ov_col4:
+            st.markdown("**🏭 Sector % Change**")
+            sector_overrides = {}
+            for sector in SECTOR_INDICES:
+                fetched_val = sectors.get(sector)
+                sector_overrides[sector] = st.number_input(
+                    sector,
+                    min_value=-20.0, max_value=20.0, step=0.01, format="%.2f",
+                    value=float(fetched_val) if fetched_val is not None else 0.0,
+                    key=f"ov_sec_{sector}",
+                    help=f"Fetched: {fetched_val}%" if fetched_val is not None else "Not fetched"
+                )
+            if sectors:
+                st.caption(f"✅ Fetched {len([v for v in sectors.values() if v is not None])}/10 sectors")
+            else:
+                st.caption("⚠️ Fetch failed — enter % changes manually")
+
+        st.form_submit_button("Apply overrides", type="primary")
 
 # ── Apply overrides: replace fetched data with user-edited values ──
 # VIX
@@ -919,53 +1155,58 @@ vix_tuple = (_vix_val if _vix_val != 0.0 else None,
              _vix_prev if _vix_prev != 0.0 else None)
 
 # Top 10
-_top10_ov = {n: st.session_state.get(f"ov_top10_{n}") for n in [t.replace(".NS","") for t in NIFTY_TOP10]}
+_top10_ov = {n: st.session_state.get(f"ov_top10_{n}") for n in NIFTY_TOP10_NAMES}
 top10 = {k: v for k, v in _top10_ov.items()}
 
 # Sectors
 _sec_ov = {s: st.session_state.get(f"ov_sec_{s}") for s in SECTOR_INDICES}
 sectors = {k: v for k, v in _sec_ov.items()}
 
+# Up/down counts — computed once, shared by the data cards and the scoring panel
+breadth       = count_up_down(top10)
+sector_counts = count_up_down(sectors)
+
 # OI
-_put  = st.session_state.get("ov_put_oi",  oi_fetched_put  if oi_data else 0)
-_call = st.session_state.get("ov_call_oi", oi_fetched_call if oi_data else 0)
-_exp  = st.session_state.get("ov_expiry",  oi_fetched_expiry if oi_data else "")
-_spot = st.session_state.get("ov_spot",    float(oi_fetched_spot) if (oi_data and oi_data[4] != "N/A") else 0.0)
+_put  = st.session_state.get(f"ov_put_oi_{oi_src}",  oi_fetched_put  if oi_data else 0)
+_call = st.session_state.get(f"ov_call_oi_{oi_src}", oi_fetched_call if oi_data else 0)
+_exp  = st.session_state.get(f"ov_expiry_{oi_src}",  oi_fetched_expiry if oi_data else "")
+_spot = st.session_state.get(f"ov_spot_{oi_src}",    oi_fetched_spot)
 if _put > 0 and _call > 0:
     oi_data = (round(_put / _call, 3), _put, _call, _exp, _spot)
 else:
     oi_data = None
+spot = _spot or None
 
 # ── Route by status ──
 if status == "live":
     st.success("🟢 **Market LIVE** — Data refreshes every 5 min")
-    render_data_cards(vix_tuple, top10, sectors, oi_data, "📡 Live Market Data")
-    render_live_scoring(vix_tuple, top10, sectors, oi_data)
+    render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, "📡 Live Market Data")
+    render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot)
 
 elif status == "opening":
     st.warning("🟡 **Opening Phase (9:15–9:30 AM)** — Wait before trading. Checking data is fine.")
-    render_data_cards(vix_tuple, top10, sectors, oi_data, "📡 Today's Opening Data")
-    render_live_scoring(vix_tuple, top10, sectors, oi_data)
+    render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, "📡 Today's Opening Data")
+    render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot)
 
 elif status == "closing":
     st.error("🔴 **After 3:20 PM — Square off ALL positions now. No new entries.**")
-    render_data_cards(vix_tuple, top10, sectors, oi_data, "📅 Today's Session Data")
-    render_live_scoring(vix_tuple, top10, sectors, oi_data)
+    render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, "📅 Today's Session Data")
+    render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot)
 
 elif status == "pre":
     st.info(f"🕐 **Pre-Market** — Market opens at 09:15 AM. Showing last session data.")
     day = last_trading_day_label()
-    render_data_cards(vix_tuple, top10, sectors, oi_data, f"📅 Last Session Data ({day})")
+    render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, f"📅 Last Session Data ({day})")
     st.info("📊 **Backtest / Planning Mode** — Enter yesterday's data below to simulate signals and strikes.")
-    render_live_scoring(vix_tuple, top10, sectors, oi_data)
+    render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot)
 
 elif status in ("closed", "weekend"):
     label = "Weekend" if status == "weekend" else "Market Closed"
     st.info(f"🔒 **{label}** — Next session: {next_market_open()}")
     day = last_trading_day_label()
-    render_data_cards(vix_tuple, top10, sectors, oi_data, f"📅 Last Session Data ({day})")
+    render_data_cards(vix_tuple, top10, sectors, breadth, sector_counts, oi_data, spot, f"📅 Last Session Data ({day})")
     st.info("📊 **Backtest / Planning Mode** — Enter any historical data below to simulate signals and strikes.")
-    render_live_scoring(vix_tuple, top10, sectors, oi_data)
+    render_live_scoring(vix_tuple, breadth, sector_counts, oi_data, spot)
 
 # ── Footer ──
 st.divider()